@@ -14,20 +14,28 @@
 # limitations under the License.
 
 import argparse
+import atexit
 import base64
+import copy
+import functools
 import json
 import logging
 import os
+import random
 import re
+import socket
 import sys
+import threading
 import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from importlib.resources import files
 from pathlib import Path
 
-import boto3
-import paramiko
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s", datefmt="%Y-%m-%d %H:%M:%S")
@@ -37,6 +45,71 @@ logger = logging.getLogger(__name__)
 DEFAULT_CONFIG_FILE = "cluster-config.json"
 RESOURCE_FILE = "cluster-resources.json"
 KUBECONFIG_FILE = "kubeconfig"
+CACHE_FILE = "cache.json"
+
+# Tag set on every AWS resource created for a cluster, holding the cluster name
+CLUSTER_TAG_KEY = "aws-k8s-cluster"
+
+# Root volume of every instance, also the size of images built with build-ami
+ROOT_BLOCK_DEVICE_MAPPINGS = [
+    {
+        "DeviceName": "/dev/sda1",
+        "Ebs": {
+            "VolumeSize": 20,
+            "VolumeType": "gp3",
+            "DeleteOnTermination": True,
+        },
+    }
+]
+
+# Instance type used to build node images when the config does not set build_instance_type
+DEFAULT_BUILD_INSTANCE_TYPE = "t3.medium"
+
+# Appended to the worker user data when building an image: reset cloud-init and the machine ID so instances
+# launched from the image run their own user data and get their own identity on first boot, then stop the
+# instance so the image is taken from a clean state
+BUILD_AMI_USER_DATA_SUFFIX = b"""
+cloud-init clean --logs --machine-id
+poweroff
+"""
+
+# Inserted after the shebang of the image builder user data: a failing script never reaches the poweroff above,
+# report the failure on the console so build-ami can stop waiting for the instance. The message is assembled by
+# printf as the script runs with -x, which echoes the trap itself to the console
+BUILD_AMI_FAILURE_MESSAGE = "aws-k8s build-ami: user data failed"
+BUILD_AMI_FAILURE_TRAP = (
+    b"trap '[ $? -eq 0 ] || printf \"aws-k8s build-ami: user data %s\\n\" failed > /dev/console' EXIT\n"
+)
+
+# Printed between the join command and the admin kubeconfig when both are fetched from the main node at once
+CREDENTIALS_SEPARATOR = "---aws-k8s-admin-conf---"
+
+# Created by the worker user data once the node is ready to join, and the exit code the join command uses
+# while it is still missing
+WORKER_READY_MARKER = "/run/aws-k8s-ready"
+WORKER_NOT_READY_EXIT = 100
+
+# Shared by all AWS clients: adaptive client-side rate limiting absorbs API throttling during bursts of polls,
+# and a larger keepalive connection pool lets concurrent calls reuse TCP connections
+BOTO_CONFIG_OPTIONS = {
+    "max_pool_connections": 32,
+    "retries": {"mode": "adaptive", "max_attempts": 10},
+    "tcp_keepalive": True,
+}
+
+# Cache lifetimes, in seconds
+AMI_CACHE_TTL = 15 * 60
+VPC_CACHE_TTL = 24 * 3600
+
+# API server address in kubeconfig files, anchored on the `server:` key so base64 certificate data is not scanned
+_KUBECONFIG_SERVER_RE = re.compile(r"^(\s*server: )https://[0-9.]+:6443$", re.MULTILINE)
+
+# Top-level status line of `cloud-init status --long`, not to be confused with `extended_status:`
+_CLOUD_INIT_STATUS_RE = re.compile(r"^status: (\S+)", re.MULTILINE)
+
+# Open SSH connections, keyed by (host, username)
+_ssh_pool = {}
+_ssh_pool_lock = threading.Lock()
 
 
 def get_data_dir():
@@ -75,6 +148,35 @@ def list_clusters():
     return clusters
 
 
+def credentials_scope():
+    """Identify the AWS credentials in use without an API call, to keep account specific cache entries apart"""
+    return os.environ.get("AWS_ACCESS_KEY_ID") or os.environ.get("AWS_PROFILE") or "default"
+
+
+def get_cached(key, ttl, fetch, refresh=False):
+    """Return a cached value if it is younger than ttl seconds, otherwise fetch and cache it"""
+    cache_file = get_data_dir() / CACHE_FILE
+    cache = {}
+    if cache_file.exists():
+        try:
+            with open(cache_file) as f:
+                cache = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable cache {cache_file}: {e}")
+
+    entry = cache.get(key)
+    if entry and not refresh and time.time() - entry["ts"] < ttl:
+        logger.info(f"Using cached value for {key}")
+        return entry["value"]
+
+    value = fetch()
+    cache[key] = {"value": value, "ts": time.time()}
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(cache_file, "w") as f:
+        json.dump(cache, f, indent=2)
+    return value
+
+
 def load_config(config_file):
     """Load configuration from JSON file"""
     if not os.path.exists(config_file):
@@ -87,8 +189,26 @@ def load_config(config_file):
     return config
 
 
-def create_vpc_resources(ec2, region, vpc_cidr_block, allowed_ingress, existing_resources=None):
+def create_clients(region, *services):
+    """Create AWS clients for the given services, sharing one session and the common client configuration"""
+    # boto3 takes a noticeable time to import, only pay for it in the commands that talk to AWS
+    import boto3
+    from botocore.config import Config
+
+    session = boto3.Session(region_name=region)
+    config = Config(**BOTO_CONFIG_OPTIONS)
+    return [session.client(service, config=config) for service in services]
+
+
+def cluster_tag_specifications(resource_type, cluster_name):
+    """Build TagSpecifications marking a resource as part of the cluster, applied at creation"""
+    return [{"ResourceType": resource_type, "Tags": [{"Key": CLUSTER_TAG_KEY, "Value": cluster_name}]}]
+
+
+def create_vpc_resources(ec2, cluster_name, region, vpc_cidr_block, allowed_ingress, existing_resources=None):
     """Create VPC, subnet, internet gateway, and security group"""
+    from botocore.exceptions import ClientError
+
     # Check if VPC resources already exist
     if (
         existing_resources
@@ -101,12 +221,29 @@ def create_vpc_resources(ec2, region, vpc_cidr_block, allowed_ingress, existing_
 
     logger.info("Creating VPC resources")
 
-    # Get default VPC
-    vpcs = ec2.describe_vpcs(Filters=[{"Name": "isDefault", "Values": ["true"]}])
-    vpc_id = vpcs["Vpcs"][0]["VpcId"]
+    # Get default VPC, it belongs to an account so the cache entry is scoped to the credentials
+    vpc_cache_key = f"default_vpc::{credentials_scope()}::{region}"
+
+    def fetch_default_vpc():
+        return ec2.describe_vpcs(Filters=[{"Name": "isDefault", "Values": ["true"]}])["Vpcs"][0]["VpcId"]
+
+    vpc_id = get_cached(vpc_cache_key, VPC_CACHE_TTL, fetch_default_vpc)
 
     # Create subnet
-    subnet = ec2.create_subnet(VpcId=vpc_id, CidrBlock=vpc_cidr_block, AvailabilityZone=f"{region}a")
+    subnet_spec = {
+        "CidrBlock": vpc_cidr_block,
+        "AvailabilityZone": f"{region}a",
+        "TagSpecifications": cluster_tag_specifications("subnet", cluster_name),
+    }
+    try:
+        subnet = ec2.create_subnet(VpcId=vpc_id, **subnet_spec)
+    except ClientError as e:
+        # The cached VPC can come from other credentials sharing the same scope, look it up again
+        if e.response["Error"]["Code"] != "InvalidVpcID.NotFound":
+            raise
+        logger.info(f"Cached default VPC {vpc_id} not found, looking it up again")
+        vpc_id = get_cached(vpc_cache_key, VPC_CACHE_TTL, fetch_default_vpc, refresh=True)
+        subnet = ec2.create_subnet(VpcId=vpc_id, **subnet_spec)
     subnet_id = subnet["Subnet"]["SubnetId"]
     logger.info(f"Created subnet: {subnet_id}")
 
@@ -116,7 +253,10 @@ def create_vpc_resources(ec2, region, vpc_cidr_block, allowed_ingress, existing_
 
     # Create security group
     sg = ec2.create_security_group(
-        GroupName=f"k8s-cluster-{int(time.time())}", Description="Security group for Kubernetes cluster", VpcId=vpc_id
+        GroupName=f"k8s-cluster-{int(time.time())}",
+        Description="Security group for Kubernetes cluster",
+        VpcId=vpc_id,
+        TagSpecifications=cluster_tag_specifications("security-group", cluster_name),
     )
     sg_id = sg["GroupId"]
     logger.info(f"Created security group: {sg_id}")
@@ -144,195 +284,352 @@ def create_vpc_resources(ec2, region, vpc_cidr_block, allowed_ingress, existing_
     return vpc_id, subnet_id, sg_id
 
 
+@functools.cache
 def read_user_data(filename):
-    """Read user data script from package resources"""
+    """Read user data script from package resources as bytes"""
     try:
         # Try to read from package resources first
         user_data_files = files("aws_k8s").joinpath("user_data")
         script_path = user_data_files.joinpath(filename)
-        return script_path.read_text()
+        return script_path.read_bytes()
     except (FileNotFoundError, AttributeError):
         # Fall back to reading from current directory for development
         logger.warning(f"Reading {filename} from current directory")
         try:
-            with open(filename) as f:
+            with open(filename, "rb") as f:
                 return f.read()
         except FileNotFoundError:
             logger.warning(f"{filename} not found, using empty user data")
-            return ""
+            return b""
+
 
+@functools.cache
+def read_user_data_b64(filename):
+    """Read user data script base64 encoded, as expected by the EC2 API"""
+    return base64.b64encode(read_user_data(filename)).decode("ascii")
 
-def get_ami_id(ssm, ami_ssm_parameter):
+
+def get_ami_id(ssm, ami_ssm_parameter, refresh=False):
     """Get AMI ID from SSM parameter"""
-    logger.info("Fetching AMI ID from SSM")
-    response = ssm.get_parameter(Name=ami_ssm_parameter)
-    ami_id = response["Parameter"]["Value"]
+
+    def fetch_ami_id():
+        logger.info("Fetching AMI ID from SSM")
+        return ssm.get_parameter(Name=ami_ssm_parameter)["Parameter"]["Value"]
+
+    # AMI IDs are regional, so is the cache entry
+    ami_id = get_cached(
+        f"ami::{ssm.meta.region_name}::{ami_ssm_parameter}", AMI_CACHE_TTL, fetch_ami_id, refresh=refresh
+    )
     logger.info(f"Using AMI: {ami_id}")
     return ami_id
 
 
-def launch_spot_instance(ec2, name, instance_type, subnet_id, sg_id, user_data, ami_id, key_name):
-    """Launch a spot instance"""
-    logger.info(f"Launching {name} ({instance_type})")
-
-    # Base64 encode user data
-    user_data_encoded = base64.b64encode(user_data.encode("utf-8")).decode("utf-8")
-
-    response = ec2.request_spot_instances(
-        SpotPrice="1.0",  # Max price per hour
-        InstanceCount=1,
-        Type="one-time",
-        LaunchSpecification={
-            "ImageId": ami_id,
-            "InstanceType": instance_type,
-            "KeyName": key_name,
-            "SubnetId": subnet_id,
-            "SecurityGroupIds": [sg_id],
-            "UserData": user_data_encoded,
-            "BlockDeviceMappings": [
-                {
-                    "DeviceName": "/dev/sda1",
-                    "Ebs": {
-                        "VolumeSize": 20,
-                        "VolumeType": "gp3",
-                        "DeleteOnTermination": True,
-                    },
-                }
-            ],
+def base_launch_specification(ami_id, key_name, subnet_id, sg_id):
+    """Build the launch specification fields shared by all cluster instances"""
+    return {
+        "ImageId": ami_id,
+        "KeyName": key_name,
+        "SubnetId": subnet_id,
+        "SecurityGroupIds": [sg_id],
+        "BlockDeviceMappings": ROOT_BLOCK_DEVICE_MAPPINGS,
+    }
+
+
+def launch_spot_instances(ec2, cluster_name, launch_specification, count):
+    """Launch count spot instances from a complete launch specification, returns their instance IDs"""
+    logger.info(f"Launching {count} spot instance(s) ({launch_specification['InstanceType']})")
+
+    response = ec2.run_instances(
+        **launch_specification,
+        MinCount=count,
+        MaxCount=count,
+        InstanceMarketOptions={
+            "MarketType": "spot",
+            "SpotOptions": {
+                "MaxPrice": "1.0",  # Max price per hour
+                "SpotInstanceType": "one-time",
+                "InstanceInterruptionBehavior": "terminate",
+            },
         },
+        TagSpecifications=cluster_tag_specifications("instance", cluster_name),
     )
 
-    spot_request_id = response["SpotInstanceRequests"][0]["SpotInstanceRequestId"]
-    logger.info(f"Spot request created: {spot_request_id}")
+    instance_ids = [instance["InstanceId"] for instance in response["Instances"]]
+    logger.info(f"Instances launched: {', '.join(instance_ids)}")
+    return instance_ids
 
-    # Wait for spot request to be fulfilled
-    logger.info("Waiting for spot request fulfillment")
-    while True:
-        requests = ec2.describe_spot_instance_requests(SpotInstanceRequestIds=[spot_request_id])
-        status = requests["SpotInstanceRequests"][0]["Status"]["Code"]
 
-        if status == "fulfilled":
-            instance_id = requests["SpotInstanceRequests"][0]["InstanceId"]
-            logger.info(f"Instance {instance_id} launched")
-            break
-        elif status in ["price-too-low", "canceled-before-fulfillment", "bad-parameters"]:
-            logger.error(f"Spot request failed: {status}")
-            sys.exit(1)
+def tag_instances(ec2, nodes, attempts=6, base_delay=0.5):
+    """Tag instances with their node name, with one create_tags call per distinct name"""
+    from botocore.exceptions import ClientError
 
-        time.sleep(5)
+    instances_by_name = {}
+    for node in nodes:
+        instances_by_name.setdefault(node["name"], []).append(node["instance_id"])
 
-    # Wait for instance to be running
-    logger.info("Waiting for instance to be running")
-    waiter = ec2.get_waiter("instance_running")
-    waiter.wait(InstanceIds=[instance_id])
+    for name, instance_ids in instances_by_name.items():
+        for attempt in range(attempts):
+            try:
+                ec2.create_tags(Resources=instance_ids, Tags=[{"Key": "Name", "Value": name}])
+                break
+            except ClientError as e:
+                # Freshly launched instances can take a moment to become visible
+                if e.response["Error"]["Code"] != "InvalidInstanceID.NotFound" or attempt == attempts - 1:
+                    raise
+                time.sleep(base_delay * 2**attempt + random.uniform(0, base_delay))
+        logger.info(f"Tagged instances {', '.join(instance_ids)} with name {name}")
+
+
+def wait_for_instances(ec2, instance_ids, timeout=300, delay=2):
+    """Wait for instances to be running with a public IP, returns their addresses by instance ID"""
+    from botocore.exceptions import ClientError
+
+    pending = set(instance_ids)
+    addresses = {}
+    if not pending:
+        return addresses
+
+    logger.info("Waiting for instances to be running with a public IP")
+    start_time = time.time()
 
-    # Tag the instance
-    ec2.create_tags(Resources=[instance_id], Tags=[{"Key": "Name", "Value": name}])
-    logger.info(f"Tagged instance {instance_id} with name {name}")
+    while time.time() - start_time < timeout:
+        try:
+            instances = ec2.describe_instances(InstanceIds=list(pending))
+        except ClientError as e:
+            # Freshly launched instances can take a moment to become visible
+            if e.response["Error"]["Code"] != "InvalidInstanceID.NotFound":
+                raise
+            instances = {"Reservations": []}
+
+        for reservation in instances["Reservations"]:
+            for instance in reservation["Instances"]:
+                instance_id = instance["InstanceId"]
+                state = instance["State"]["Name"]
+                if state in ["shutting-down", "terminated", "stopping", "stopped"]:
+                    raise RuntimeError(f"Instance {instance_id} is {state}")
+                if state != "running":
+                    continue
+
+                public_ip = instance.get("PublicIpAddress")
+                addresses[instance_id] = {"private_ip": instance.get("PrivateIpAddress"), "public_ip": public_ip}
+                if not public_ip:
+                    continue
+                pending.discard(instance_id)
+                logger.info(f"Instance {instance_id} running with public IP {public_ip}")
 
-    # Get instance details and wait for public IP assignment
-    logger.info("Waiting for public IP assignment")
-    public_ip = None
-    for attempt in range(30):  # Try for up to 30 seconds
-        instances = ec2.describe_instances(InstanceIds=[instance_id])
-        instance = instances["Reservations"][0]["Instances"][0]
-        public_ip = instance.get("PublicIpAddress")
+        if not pending:
+            return addresses
 
-        if public_ip:
-            logger.info(f"Public IP assigned: {public_ip}")
-            break
+        time.sleep(delay)
 
-        time.sleep(1)
+    not_running = [instance_id for instance_id in pending if instance_id not in addresses]
+    if not_running:
+        raise RuntimeError(f"Timed out waiting for instances to be running: {', '.join(not_running)}")
 
-    if not public_ip:
+    for instance_id in pending:
         logger.warning(f"No public IP assigned to {instance_id}")
+    return addresses
+
+
+def open_ssh(host, key_path, username="ubuntu", **kwargs):
+    """Open an SSH connection to host and add it to the pool"""
+    import paramiko
+
+    kwargs.setdefault("banner_timeout", 30)
+    ssh = paramiko.SSHClient()
+    ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+    ssh.connect(host, username=username, key_filename=key_path, **kwargs)
+    # Pooled connections can sit idle for minutes while other nodes are being prepared
+    ssh.get_transport().set_keepalive(30)
+
+    with _ssh_pool_lock:
+        previous = _ssh_pool.get((host, username))
+        _ssh_pool[(host, username)] = ssh
+    if previous is not None:
+        previous.close()
+    return ssh
+
+
+def get_ssh(host, key_path, username="ubuntu"):
+    """Get a pooled SSH connection to host, opening it on first use"""
+    with _ssh_pool_lock:
+        ssh = _ssh_pool.get((host, username))
+    if ssh is not None:
+        transport = ssh.get_transport()
+        if transport is not None and transport.is_active():
+            return ssh
+
+    return open_ssh(host, key_path, username)
+
+
+def close_ssh_pool():
+    """Close all pooled SSH connections"""
+    with _ssh_pool_lock:
+        for ssh in _ssh_pool.values():
+            ssh.close()
+        _ssh_pool.clear()
 
-    return {
-        "spot_request_id": spot_request_id,
-        "instance_id": instance_id,
-        "public_ip": public_ip,
-        "private_ip": instance.get("PrivateIpAddress"),
-    }
 
+atexit.register(close_ssh_pool)
 
-def wait_for_ssh(host, key_path, timeout=300):
-    """Wait for SSH to become available"""
+
+def wait_for_ssh(host, key_path, timeout=300, base_delay=0.5, max_delay=8, jitter=0.5):
+    """Wait for SSH to become available, retrying with exponential backoff"""
     logger.info(f"Waiting for SSH on {host}")
     start_time = time.time()
+    attempt = 0
 
     while time.time() - start_time < timeout:
         try:
-            ssh = paramiko.SSHClient()
-            ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-            ssh.connect(host, username="ubuntu", key_filename=key_path, timeout=5)
-            ssh.close()
+            # Cheap TCP probe first, only attempt the SSH handshake once the port accepts connections
+            socket.create_connection((host, 22), timeout=2).close()
+            # Keep the probe connection, later commands on this host reuse it
+            open_ssh(host, key_path, timeout=2, banner_timeout=10, auth_timeout=10)
             logger.info(f"SSH available on {host}")
             return True
         except Exception:
-            time.sleep(5)
+            delay = min(max_delay, base_delay * 2**attempt) + random.uniform(0, jitter)
+            attempt += 1
+            time.sleep(delay)
 
     return False
 
 
-def wait_for_cloud_init(host, key_path):
+def wait_for_cloud_init(host, key_path, timeout=1800, max_delay=2.0):
     """Wait for cloud-init to complete"""
     logger.info(f"Waiting for cloud-init on {host}")
-    ssh = paramiko.SSHClient()
-    ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-    ssh.connect(host, username="ubuntu", key_filename=key_path)
+    ssh = get_ssh(host, key_path)
+    start_time = time.time()
+    delay = 0.5
 
-    # Use --wait flag to block until cloud-init is done
-    stdin, stdout, stderr = ssh.exec_command("cloud-init status --wait")
-    exit_status = stdout.channel.recv_exit_status()  # Wait for command to complete
+    # Poll the status instead of blocking a session on `cloud-init status --wait`, the long format carries
+    # the error details so a failure needs no second command
+    while time.time() - start_time < timeout:
+        stdin, stdout, stderr = ssh.exec_command("cloud-init status --long")
+        status_output = stdout.read().decode().strip()
+        match = _CLOUD_INIT_STATUS_RE.search(status_output)
+        status = match.group(1) if match else None
+
+        if status == "done":
+            logger.info(f"Cloud-init completed successfully on {host}")
+            return
+        elif status == "disabled":
+            logger.info(f"Cloud-init finished on {host} with status: {status}")
+            return
+        elif status == "error":
+            logger.error(f"Cloud-init failed on {host}:\n{status_output}")
+            raise RuntimeError(f"Cloud-init failed on {host}")
+
+        time.sleep(delay)
+        delay = min(delay * 1.5, max_delay)
+
+    raise RuntimeError(f"Timed out waiting for cloud-init on {host}")
+
+
+def get_cluster_credentials(main_ip, key_path, timeout=300, delay=2):
+    """Get the kubeadm join command and the admin kubeconfig from main node"""
+    logger.info("Getting kubeadm join command and kubeconfig")
+    ssh = get_ssh(main_ip, key_path)
+    start_time = time.time()
+
+    # The token can only be created once kubeadm init is done, retry until the control plane answers.
+    # admin.conf is only readable by root, read it over the same channel rather than staging a copy
+    command = (
+        "sudo sh -c 'kubeadm token create --print-join-command && "
+        f"echo {CREDENTIALS_SEPARATOR} && cat /etc/kubernetes/admin.conf'"
+    )
+    while True:
+        stdin, stdout, stderr = ssh.exec_command(command)
+        output = stdout.read().decode()
+        join_command, separator, kubeconfig = output.partition(f"{CREDENTIALS_SEPARATOR}\n")
+        if stdout.channel.recv_exit_status() == 0 and separator and join_command.strip():
+            return join_command.strip(), kubeconfig
 
-    if exit_status != 0:
         error_output = stderr.read().decode().strip()
-        logger.error(f"cloud-init failed on {host} with exit code {exit_status}: {error_output}")
-        ssh.close()
-        raise RuntimeError(f"cloud-init failed on {host}")
-
-    # Check the actual status
-    stdin, stdout, stderr = ssh.exec_command("cloud-init status")
-    status_output = stdout.read().decode().strip()
-
-    if "status: done" in status_output:
-        logger.info(f"Cloud-init completed successfully on {host}")
-    elif "status: error" in status_output:
-        logger.error(f"Cloud-init failed on {host}: {status_output}")
-        ssh.close()
-        raise RuntimeError(f"Cloud-init failed on {host}")
-    else:
-        logger.info(f"Cloud-init finished on {host} with status: {status_output}")
+        if time.time() - start_time >= timeout:
+            raise RuntimeError(f"Failed to get cluster credentials from {main_ip}: {error_output}")
+        logger.debug(f"Join command not available yet on {main_ip}: {error_output}")
+        time.sleep(delay)
 
-    ssh.close()
 
+def prepare_main_node(main_ip, key_path):
+    """Wait for the main node to be ready and return the kubeadm join command and the admin kubeconfig"""
+    if not wait_for_ssh(main_ip, key_path):
+        raise RuntimeError(f"SSH not available on {main_ip}")
+    wait_for_cloud_init(main_ip, key_path)
+    return get_cluster_credentials(main_ip, key_path)
 
-def get_join_command(main_ip, key_path):
-    """Get kubeadm join command from main node"""
-    logger.info("Getting kubeadm join command")
-    ssh = paramiko.SSHClient()
-    ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-    ssh.connect(main_ip, username="ubuntu", key_filename=key_path)
 
-    stdin, stdout, stderr = ssh.exec_command("sudo kubeadm token create --print-join-command")
-    join_command = stdout.read().decode().strip()
+def join_worker_to_cluster(worker_ip, key_path, join_command, timeout=1800, max_delay=5.0):
+    """Join worker node to the cluster"""
+    logger.info(f"Joining worker {worker_ip} to cluster")
+    ssh = get_ssh(worker_ip, key_path)
+    start_time = time.time()
+    delay = 1.0
+
+    # Try to join straight away and retry while the user data is still running, rather than waiting for
+    # cloud-init first. The cloud-init status is only printed when the node is not ready yet, it is read
+    # before checking the marker so a finished status means the marker is never going to be written
+    command = (
+        f'status=$(cloud-init status); if [ ! -e {WORKER_READY_MARKER} ]; then echo "$status"; '
+        f"exit {WORKER_NOT_READY_EXIT}; fi; set -e; sudo {join_command}; systemctl is-active --quiet kubelet"
+    )
+    logged_wait = False
+    while time.time() - start_time < timeout:
+        stdin, stdout, stderr = ssh.exec_command(command)
+        exit_status = stdout.channel.recv_exit_status()  # Wait for command to complete
+
+        if exit_status == 0:
+            logger.info(f"Worker {worker_ip} joined successfully")
+            return
+
+        if exit_status == WORKER_NOT_READY_EXIT:
+            match = _CLOUD_INIT_STATUS_RE.search(stdout.read().decode())
+            status = match.group(1) if match else None
+            if status == "error":
+                raise RuntimeError(f"Cloud-init failed on {worker_ip}")
+            elif status in ["done", "disabled"]:
+                raise RuntimeError(
+                    f"Cloud-init finished on {worker_ip} with status {status} but {WORKER_READY_MARKER} is missing"
+                )
+            if not logged_wait:
+                logger.info(f"Waiting for user data to finish on {worker_ip} (cloud-init status: {status})")
+                logged_wait = True
+            time.sleep(delay)
+            delay = min(delay * 1.5, max_delay)
+            continue
 
-    ssh.close()
-    return join_command
+        error_output = stderr.read().decode().strip()
+        # A previous run joined the node but did not get to record it
+        if "/etc/kubernetes/kubelet.conf already exists" in error_output:
+            logger.info(f"Worker {worker_ip} already joined")
+            return
 
+        logger.error(f"Failed to join worker {worker_ip} with exit code {exit_status}: {error_output}")
+        raise RuntimeError(f"Failed to join worker {worker_ip}")
 
-def join_worker_to_cluster(worker_ip, key_path, join_command):
-    """Join worker node to the cluster"""
-    logger.info(f"Joining worker {worker_ip} to cluster")
-    ssh = paramiko.SSHClient()
-    ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-    ssh.connect(worker_ip, username="ubuntu", key_filename=key_path)
+    raise RuntimeError(f"Timed out waiting for {worker_ip} to be ready to join")
+
+
+def prepare_and_join_worker(worker_ip, key_path, join_future):
+    """Wait for a worker node to be ready and join it to the cluster once the join command is known"""
+    if not wait_for_ssh(worker_ip, key_path):
+        raise RuntimeError(f"SSH not available on {worker_ip}")
+    join_command, _ = join_future.result()
+    join_worker_to_cluster(worker_ip, key_path, join_command)
 
-    stdin, stdout, stderr = ssh.exec_command(f"sudo {join_command}")
-    stdout.channel.recv_exit_status()  # Wait for command to complete
 
-    logger.info(f"Worker {worker_ip} joined successfully")
-    ssh.close()
+@functools.lru_cache(maxsize=256)
+def _load_resources_cached(path, mtime_ns):
+    """Parse a resource file, cached for as long as its modification time does not change"""
+    with open(path, "rb") as f:
+        data = f.read()
+    return orjson.loads(data) if orjson else json.loads(data)
+
+
+def read_resource_file(resource_file):
+    """Read a resource file through the cache, callers must not modify the result"""
+    return _load_resources_cached(str(resource_file), resource_file.stat().st_mtime_ns)
 
 
 def load_resources(cluster_name):
@@ -341,38 +638,99 @@ def load_resources(cluster_name):
     resource_file = cluster_dir / RESOURCE_FILE
 
     if resource_file.exists():
-        with open(resource_file) as f:
-            resources = json.load(f)
+        # Copied since the caller updates resources in place
+        resources = copy.deepcopy(read_resource_file(resource_file))
         logger.info(f"Loaded existing resources from {resource_file}")
         return resources
     return None
 
 
 def save_resources(cluster_name, resources):
-    """Save resource IDs to JSON file"""
+    """Atomically save resource IDs to JSON file"""
     cluster_dir = ensure_cluster_dir(cluster_name)
     resource_file = cluster_dir / RESOURCE_FILE
+    tmp_file = resource_file.with_suffix(".tmp")
 
-    with open(resource_file, "w") as f:
-        json.dump(resources, f, indent=2)
+    # The file is only read back by this tool, so it is written compact
+    if orjson:
+        data = orjson.dumps(resources)
+    else:
+        data = json.dumps(resources, separators=(",", ":")).encode("utf-8")
+    tmp_file.write_bytes(data)
+    os.replace(tmp_file, resource_file)
     logger.debug(f"Resources saved to {resource_file}")
 
 
-def download_kubeconfig(cluster_name, main_ip, key_path):
-    """Download and configure kubeconfig from main node"""
-    logger.info("Downloading kubeconfig")
-    ssh = paramiko.SSHClient()
-    ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-    ssh.connect(main_ip, username="ubuntu", key_filename=key_path)
-
-    # Get kubeconfig from main node
-    stdin, stdout, stderr = ssh.exec_command("sudo cat /etc/kubernetes/admin.conf")
-    kubeconfig = stdout.read().decode()
-
-    ssh.close()
-
-    # Replace internal IP with public IP using regex
-    kubeconfig = re.sub(r"https://[0-9.]+:6443", f"https://{main_ip}:6443", kubeconfig)
+class ResourceStore:
+    """Thread-safe in-memory view of a cluster's resources, written to disk by a background thread"""
+
+    def __init__(self, cluster_name, resources, flush_interval=0.25):
+        self.cluster_name = cluster_name
+        self._resources = resources
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._closed = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_periodically, args=(flush_interval,), daemon=True)
+        self._flusher.start()
+        atexit.register(self.close)
+
+    def __getitem__(self, key):
+        with self._lock:
+            return self._resources[key]
+
+    def __setitem__(self, key, value):
+        self.update(**{key: value})
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._resources
+
+    def get(self, key, default=None):
+        with self._lock:
+            return self._resources.get(key, default)
+
+    def update(self, **kwargs):
+        with self._lock:
+            self._resources.update(kwargs)
+            self._dirty = True
+
+    def set_node(self, node_name, node):
+        with self._lock:
+            self._resources.setdefault("nodes", {})[node_name] = node
+            self._dirty = True
+
+    def update_node(self, node_name, **fields):
+        with self._lock:
+            self._resources["nodes"][node_name].update(fields)
+            self._dirty = True
+
+    def flush(self):
+        """Write resources to disk if they changed since the last flush"""
+        with self._lock:
+            if not self._dirty:
+                return
+            save_resources(self.cluster_name, self._resources)
+            self._dirty = False
+
+    def close(self):
+        """Stop background flushing and write any pending changes, also called at exit"""
+        self._closed.set()
+        self._flusher.join()
+        self.flush()
+
+    def _flush_periodically(self, interval):
+        while not self._closed.wait(interval):
+            self.flush()
+
+
+def save_kubeconfig(cluster_name, kubeconfig, main_ip, private_ip=None):
+    """Configure the kubeconfig fetched from main node and save it in the cluster directory"""
+    # Replace internal IP with public IP in the server address, kubeadm advertises the private IP
+    internal_server = f"https://{private_ip}:6443"
+    if private_ip and internal_server in kubeconfig:
+        kubeconfig = kubeconfig.replace(internal_server, f"https://{main_ip}:6443")
+    else:
+        kubeconfig = _KUBECONFIG_SERVER_RE.sub(rf"\g<1>https://{main_ip}:6443", kubeconfig)
 
     # Save to cluster directory
     cluster_dir = ensure_cluster_dir(cluster_name)
@@ -387,7 +745,7 @@ def download_kubeconfig(cluster_name, main_ip, key_path):
     return str(output_file)
 
 
-def create_cluster(cluster_name, config_file):
+def create_cluster(cluster_name, config_file, refresh_ami=False, use_vanilla_ami=False):
     """Create a new Kubernetes cluster"""
     # Check if cluster already exists
     existing_clusters = list_clusters()
@@ -418,8 +776,7 @@ def create_cluster(cluster_name, config_file):
         logger.error("No bootstrap node specified in configuration")
         sys.exit(1)
 
-    ec2 = boto3.client("ec2", region_name=region)
-    ssm = boto3.client("ssm", region_name=region)
+    ec2, ssm = create_clients(region, "ec2", "ssm")
 
     # Load existing resources if available
     resources = load_resources(cluster_name)
@@ -430,97 +787,89 @@ def create_cluster(cluster_name, config_file):
             "cluster_name": cluster_name,
             "nodes": {},
         }
+    resources = ResourceStore(cluster_name, resources)
 
-    # Get AMI ID from SSM
-    ami_id = get_ami_id(ssm, ami_ssm_parameter)
+    # Use the image built with build-ami if there is one, otherwise get AMI ID from SSM
+    if config.get("ami_id") and not use_vanilla_ami:
+        ami_id = config["ami_id"]
+        logger.info(f"Using prebuilt AMI: {ami_id}")
+    else:
+        ami_id = get_ami_id(ssm, ami_ssm_parameter, refresh=refresh_ami)
 
     # Create VPC resources (skip if already exist)
-    vpc_id, subnet_id, sg_id = create_vpc_resources(ec2, region, vpc_cidr_block, allowed_ingress, resources)
-    resources["vpc_id"] = vpc_id
-    resources["subnet_id"] = subnet_id
-    resources["security_group_id"] = sg_id
-    save_resources(cluster_name, resources)  # Save after VPC creation
+    vpc_id, subnet_id, sg_id = create_vpc_resources(
+        ec2, cluster_name, region, vpc_cidr_block, allowed_ingress, resources
+    )
+    resources.update(vpc_id=vpc_id, subnet_id=subnet_id, security_group_id=sg_id)
 
-    # Read user data scripts
-    main_user_data = read_user_data("user-data-main.sh")
-    worker_user_data = read_user_data("user-data-worker.sh")
+    # Read user data scripts, encoded once and shared by all launches
+    main_user_data = read_user_data_b64("user-data-main.sh")
+    worker_user_data = read_user_data_b64("user-data-worker.sh")
 
-    # Launch instances in parallel (skip already created ones)
-    logger.info("Launching instances")
+    # Plan the instances to launch (skip already created ones)
+    launches = []
+    if "main_node" not in resources.get("nodes", {}):
+        launches.append(("main_node", "k8s-main", bootstrap_instance_type, main_user_data))
+    else:
+        logger.info("Main node already exists, skipping")
 
-    # Calculate total number of nodes
-    total_nodes = sum(node_config["count"] for node_config in nodes_config.values())
-
-    with ThreadPoolExecutor(max_workers=total_nodes) as executor:
-        futures = {}
-        node_index = 0  # Global node index for naming
-
-        # Launch bootstrap node first (as main node)
-        if "main_node" not in resources.get("nodes", {}):
-            futures[
-                executor.submit(
-                    launch_spot_instance,
-                    ec2,
-                    "k8s-main",
-                    bootstrap_instance_type,
-                    subnet_id,
-                    sg_id,
-                    main_user_data,
-                    ami_id,
-                    key_name,
-                )
-            ] = "main_node"
-        else:
-            logger.info("Main node already exists, skipping")
+    node_index = 0  # Global node index for naming
+    for instance_type, node_config in nodes_config.items():
+        count = node_config["count"]
+        if instance_type == bootstrap_instance_type:
+            count -= 1
+            if count <= 0:
+                continue
+
+        for i in range(count):
+            node_key = f"node_{node_index}"
+            if node_key not in resources.get("nodes", {}):
+                # Sanitize instance type for naming (replace dots with dashes)
+                instance_type_clean = instance_type.replace(".", "-")
+                name = f"k8s-{instance_type_clean}-{i}" if count > 1 else f"k8s-{instance_type_clean}"
+                launches.append((node_key, name, instance_type, worker_user_data))
+            else:
+                logger.info(f"Node {node_key} already exists, skipping")
+            node_index += 1
+
+    # Identical instances are launched with a single call
+    groups = {}
+    for node_key, name, instance_type, user_data in launches:
+        groups.setdefault((instance_type, user_data), []).append((node_key, name))
 
-        for instance_type, node_config in nodes_config.items():
-            count = node_config["count"]
-            if instance_type == bootstrap_instance_type:
-                count -= 1
-                if count <= 0:
-                    continue
+    logger.info("Launching instances")
+    # Only the instance type and user data vary between groups
+    base_spec = base_launch_specification(ami_id, key_name, subnet_id, sg_id)
+    launched = []  # Keys of the nodes launched by this run
+    try:
+        for (instance_type, user_data), group in groups.items():
+            spec = {**base_spec, "InstanceType": instance_type, "UserData": user_data}
+            instance_ids = launch_spot_instances(ec2, cluster_name, spec, len(group))
+            for (node_key, name), instance_id in zip(group, instance_ids):
+                resources.set_node(node_key, {"name": name, "instance_id": instance_id})
+                launched.append(node_key)
+    except Exception as e:
+        logger.error(f"Failed to launch instances: {e}")
+        sys.exit(1)
 
-            for i in range(count):
-                node_key = f"node_{node_index}"
-                if node_key not in resources.get("nodes", {}):
-                    # Sanitize instance type for naming (replace dots with dashes)
-                    instance_type_clean = instance_type.replace(".", "-")
-                    name = f"k8s-{instance_type_clean}-{i}" if count > 1 else f"k8s-{instance_type_clean}"
-                    futures[
-                        executor.submit(
-                            launch_spot_instance,
-                            ec2,
-                            name,
-                            instance_type,
-                            subnet_id,
-                            sg_id,
-                            worker_user_data,
-                            ami_id,
-                            key_name,
-                        )
-                    ] = node_key
-                else:
-                    logger.info(f"Node {node_key} already exists, skipping")
-                node_index += 1
+    # Tag and wait for all new instances at once rather than one by one
+    launched_nodes = [resources["nodes"][node_key] for node_key in launched]
+    if launched_nodes:
+        tag_instances(ec2, launched_nodes)
 
-        for future in as_completed(futures):
-            node_name = futures[future]
-            try:
-                resources["nodes"][node_name] = future.result()
-                save_resources(cluster_name, resources)  # Save after each instance is created
-            except Exception as e:
-                logger.error(f"Failed to launch {node_name}: {e}")
-                sys.exit(1)
+    pending_nodes = {
+        node["instance_id"]: node_key for node_key, node in resources["nodes"].items() if not node.get("public_ip")
+    }
+    try:
+        addresses = wait_for_instances(ec2, list(pending_nodes))
+    except RuntimeError as e:
+        logger.error(f"Instances failed to start: {e}")
+        sys.exit(1)
+    for instance_id, address in addresses.items():
+        resources.update_node(pending_nodes[instance_id], **address)
 
     main_node = resources["nodes"]["main_node"]
 
-    # Wait for main node to be ready
-    wait_for_ssh(main_node["public_ip"], key_path)
-    wait_for_cloud_init(main_node["public_ip"], key_path)
-
-    # Get join command
-    join_command = get_join_command(main_node["public_ip"], key_path)
-
     # Wait for workers and join them
     workers = []
     # Collect all worker nodes (all nodes except main_node)
@@ -530,23 +879,51 @@ def create_cluster(cluster_name, config_file):
             workers.append((f"Worker {worker_index + 1}", node, f"{key}_joined"))
             worker_index += 1
 
+    pending_workers = []
     for worker_name, worker, joined_key in workers:
         if not resources.get(joined_key, False):
-            wait_for_ssh(worker["public_ip"], key_path)
-            wait_for_cloud_init(worker["public_ip"], key_path)
-            join_worker_to_cluster(worker["public_ip"], key_path, join_command)
-            resources[joined_key] = True
-            save_resources(cluster_name, resources)  # Save after each worker joins
+            pending_workers.append((worker_name, worker, joined_key))
         else:
             logger.info(f"{worker_name} already joined, skipping")
 
-    # Download kubeconfig if not already done
+    # Workers boot while the main node runs kubeadm init, each one only waits on the join command right
+    # before joining so the two waits overlap
+    with ThreadPoolExecutor(max_workers=len(pending_workers) + 1) as executor:
+        join_future = executor.submit(prepare_main_node, main_node["public_ip"], key_path)
+        futures = {
+            executor.submit(prepare_and_join_worker, worker["public_ip"], key_path, join_future): (
+                worker_name,
+                joined_key,
+            )
+            for worker_name, worker, joined_key in pending_workers
+        }
+
+        try:
+            _, kubeconfig = join_future.result()
+        except Exception as e:
+            logger.error(f"Main node failed to become ready: {e}")
+            sys.exit(1)
+
+        for future in as_completed(futures):
+            worker_name, joined_key = futures[future]
+            try:
+                future.result()
+            except Exception as e:
+                logger.error(f"Failed to join {worker_name}: {e}")
+                sys.exit(1)
+            resources[joined_key] = True
+
+    # Save kubeconfig if not already done
     if "kubeconfig_file" not in resources:
-        kubeconfig_file = download_kubeconfig(cluster_name, main_node["public_ip"], key_path)
+        kubeconfig_file = save_kubeconfig(
+            cluster_name, kubeconfig, main_node["public_ip"], private_ip=main_node.get("private_ip")
+        )
         resources["kubeconfig_file"] = kubeconfig_file
-        save_resources(cluster_name, resources)
     else:
-        logger.info("Kubeconfig already downloaded, skipping")
+        logger.info("Kubeconfig already saved, skipping")
+
+    resources.close()
+    close_ssh_pool()
 
     logger.info("Cluster provisioned successfully!")
     logger.info(f"Main node: {main_node['public_ip']}")
@@ -558,6 +935,25 @@ def create_cluster(cluster_name, config_file):
             worker_index += 1
 
 
+def delete_vpc_resource(kind, resource_id, delete, attempts=6, base_delay=2):
+    """Delete a VPC resource using the given delete call, retrying while it is still in use"""
+    from botocore.exceptions import ClientError
+
+    logger.info(f"Deleting {kind}: {resource_id}")
+    for attempt in range(attempts):
+        try:
+            delete()
+            break
+        except ClientError as e:
+            # Network interfaces of terminated instances take a while to be released
+            if e.response["Error"]["Code"] != "DependencyViolation" or attempt == attempts - 1:
+                raise
+            delay = base_delay * 2**attempt + random.uniform(0, 1)
+            logger.info(f"{kind.capitalize()} {resource_id} still in use, retrying in {delay:.1f}s")
+            time.sleep(delay)
+    logger.info(f"{kind.capitalize()} deleted")
+
+
 def delete_cluster(cluster_name):
     """Delete the Kubernetes cluster and all associated resources"""
     cluster_dir = get_cluster_dir(cluster_name)
@@ -567,9 +963,8 @@ def delete_cluster(cluster_name):
         logger.error(f"Cluster '{cluster_name}' not found")
         sys.exit(1)
 
-    # Load resources
-    with open(resource_file) as f:
-        resources = json.load(f)
+    # Load resources, they are only read here
+    resources = read_resource_file(resource_file)
 
     # Get region from resources or config
     region = resources.get("region")
@@ -577,20 +972,17 @@ def delete_cluster(cluster_name):
         logger.error("Region not found in resources")
         sys.exit(1)
 
-    ec2 = boto3.client("ec2", region_name=region)
+    (ec2,) = create_clients(region, "ec2")
 
     logger.info(f"Deleting cluster '{cluster_name}' resources")
 
     # Terminate all instances without clean shutdown
     instance_ids = []
-    spot_request_ids = []
 
-    # Collect instance and spot request IDs from nodes
+    # Collect instance IDs from nodes
     for node_name, node in resources.get("nodes", {}).items():
         if "instance_id" in node:
             instance_ids.append(node["instance_id"])
-            if "spot_request_id" in node:
-                spot_request_ids.append(node["spot_request_id"])
 
     # Terminate instances
     if instance_ids:
@@ -598,36 +990,34 @@ def delete_cluster(cluster_name):
         ec2.terminate_instances(InstanceIds=instance_ids)
         logger.info("Waiting for instances to terminate")
         waiter = ec2.get_waiter("instance_terminated")
-        waiter.wait(InstanceIds=instance_ids)
+        waiter.wait(InstanceIds=instance_ids, WaiterConfig={"Delay": 5, "MaxAttempts": 60})
         logger.info("Instances terminated")
 
-    # Cancel spot requests
-    if spot_request_ids:
-        logger.info(f"Canceling spot requests: {', '.join(spot_request_ids)}")
-        ec2.cancel_spot_instance_requests(SpotInstanceRequestIds=spot_request_ids)
-        logger.info("Spot requests canceled")
-
-    # Delete security group
+    # Security group and subnet are independent of each other once instances are gone
+    deletions = {}
     if "security_group_id" in resources:
         sg_id = resources["security_group_id"]
-        logger.info(f"Deleting security group: {sg_id}")
-        try:
-            ec2.delete_security_group(GroupId=sg_id)
-            logger.info("Security group deleted")
-        except Exception as e:
-            logger.warning(f"Could not delete security group: {e}")
-            sys.exit(1)
-
-    # Delete subnet
+        deletions["security group"] = (sg_id, lambda: ec2.delete_security_group(GroupId=sg_id))
     if "subnet_id" in resources:
         subnet_id = resources["subnet_id"]
-        logger.info(f"Deleting subnet: {subnet_id}")
-        try:
-            ec2.delete_subnet(SubnetId=subnet_id)
-            logger.info("Subnet deleted")
-        except Exception as e:
-            logger.warning(f"Could not delete subnet: {e}")
-            sys.exit(1)
+        deletions["subnet"] = (subnet_id, lambda: ec2.delete_subnet(SubnetId=subnet_id))
+
+    failed = False
+    if deletions:
+        with ThreadPoolExecutor(max_workers=len(deletions)) as executor:
+            futures = {
+                executor.submit(delete_vpc_resource, kind, resource_id, delete): kind
+                for kind, (resource_id, delete) in deletions.items()
+            }
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    logger.warning(f"Could not delete {futures[future]}: {e}")
+                    failed = True
+
+    if failed:
+        sys.exit(1)
 
     # Delete entire cluster directory (includes kubeconfig and resource file)
     import shutil
@@ -639,6 +1029,105 @@ def delete_cluster(cluster_name):
     logger.info(f"Cluster '{cluster_name}' deleted successfully!")
 
 
+def wait_for_image_builder(ec2, instance_id, timeout=1800, delay=15):
+    """Wait for the image builder to power itself off, failing as soon as its user data reports an error"""
+    from botocore.exceptions import ClientError
+
+    start_time = time.time()
+
+    while time.time() - start_time < timeout:
+        try:
+            instances = ec2.describe_instances(InstanceIds=[instance_id])
+        except ClientError as e:
+            # Freshly launched instances can take a moment to become visible
+            if e.response["Error"]["Code"] != "InvalidInstanceID.NotFound":
+                raise
+            instances = {"Reservations": []}
+
+        for reservation in instances["Reservations"]:
+            for instance in reservation["Instances"]:
+                state = instance["State"]["Name"]
+                if state == "stopped":
+                    return
+                elif state in ["shutting-down", "terminated"]:
+                    raise RuntimeError(f"Image builder {instance_id} is {state}")
+                elif state == "running":
+                    # Latest reads the live console instead of the buffered copy that is only posted at boot
+                    try:
+                        output = ec2.get_console_output(InstanceId=instance_id, Latest=True).get("Output", "")
+                    except ClientError as e:
+                        logger.debug(f"Could not read console output of {instance_id}: {e}")
+                        output = ""
+                    if BUILD_AMI_FAILURE_MESSAGE in output:
+                        raise RuntimeError(f"User data failed on image builder {instance_id}, see its console output")
+
+        time.sleep(delay)
+
+    raise RuntimeError(f"Timed out waiting for image builder {instance_id} to stop")
+
+
+def build_ami(config_file):
+    """Build an AMI with the node prerequisites installed and save its ID in the configuration file"""
+    from botocore.exceptions import WaiterError
+
+    config = load_config(config_file)
+    region = config["region"]
+    instance_type = config.get("build_instance_type", DEFAULT_BUILD_INSTANCE_TYPE)
+
+    ec2, ssm = create_clients(region, "ec2", "ssm")
+
+    base_ami_id = get_ami_id(ssm, config["ami_ssm_parameter"])
+
+    # The worker user data only installs prerequisites, nothing in it is specific to a cluster
+    shebang, _, script = read_user_data("user-data-worker.sh").partition(b"\n")
+    user_data = shebang + b"\n" + BUILD_AMI_FAILURE_TRAP + script + BUILD_AMI_USER_DATA_SUFFIX
+
+    # On-demand so the instance can be stopped, in the default subnet as nothing needs to reach it
+    logger.info(f"Launching image builder ({instance_type})")
+    response = ec2.run_instances(
+        ImageId=base_ami_id,
+        InstanceType=instance_type,
+        MinCount=1,
+        MaxCount=1,
+        UserData=base64.b64encode(user_data).decode("ascii"),
+        BlockDeviceMappings=ROOT_BLOCK_DEVICE_MAPPINGS,
+        InstanceInitiatedShutdownBehavior="stop",
+        TagSpecifications=[{"ResourceType": "instance", "Tags": [{"Key": "Name", "Value": "k8s-image-builder"}]}],
+    )
+    instance_id = response["Instances"][0]["InstanceId"]
+    logger.info(f"Image builder {instance_id} launched")
+
+    ami_id = None
+    try:
+        logger.info("Waiting for prerequisites to be installed")
+        wait_for_image_builder(ec2, instance_id)
+
+        image = ec2.create_image(
+            InstanceId=instance_id,
+            Name=f"aws-k8s-node-{int(time.time())}",
+            Description="Kubernetes node prerequisites for aws-k8s",
+            TagSpecifications=[{"ResourceType": "image", "Tags": [{"Key": "Name", "Value": "aws-k8s-node"}]}],
+        )
+        ami_id = image["ImageId"]
+        logger.info(f"Waiting for AMI {ami_id} to be available")
+        waiter = ec2.get_waiter("image_available")
+        waiter.wait(ImageIds=[ami_id], WaiterConfig={"Delay": 15, "MaxAttempts": 80})
+    except (RuntimeError, WaiterError) as e:
+        logger.error(f"Failed to build AMI: {e}")
+        if ami_id:
+            logger.error(f"AMI {ami_id} was left behind, deregister it and delete its snapshot once it is available")
+        sys.exit(1)
+    finally:
+        logger.info(f"Terminating image builder {instance_id}")
+        ec2.terminate_instances(InstanceIds=[instance_id])
+
+    config["ami_id"] = ami_id
+    with open(config_file, "w") as f:
+        json.dump(config, f, indent=2)
+
+    logger.info(f"AMI {ami_id} built and saved to {config_file}")
+
+
 def show_clusters():
     """Show all available clusters"""
     clusters = list_clusters()
@@ -650,10 +1139,7 @@ def show_clusters():
     print("Available clusters:")
     for cluster_name in clusters:
         cluster_dir = get_cluster_dir(cluster_name)
-        resource_file = cluster_dir / RESOURCE_FILE
-
-        with open(resource_file) as f:
-            resources = json.load(f)
+        resources = read_resource_file(cluster_dir / RESOURCE_FILE)
 
         created_at = resources.get("created_at", "Unknown")
         region = resources.get("region", "Unknown")
@@ -679,6 +1165,12 @@ def main():
     create_parser.add_argument(
         "--config", default=DEFAULT_CONFIG_FILE, help=f"Path to configuration file (default: {DEFAULT_CONFIG_FILE})"
     )
+    create_parser.add_argument(
+        "--refresh-ami", action="store_true", help="Look up the AMI ID from SSM even if a cached value exists"
+    )
+    create_parser.add_argument(
+        "--use-vanilla-ami", action="store_true", help="Ignore the prebuilt ami_id from the configuration file"
+    )
 
     # Delete command
     delete_parser = subparsers.add_parser("delete", help="Delete an existing cluster")
@@ -687,6 +1179,12 @@ def main():
     # List command
     subparsers.add_parser("list", help="List all clusters")
 
+    # Build AMI command
+    build_ami_parser = subparsers.add_parser("build-ami", help="Build an AMI with the node prerequisites installed")
+    build_ami_parser.add_argument(
+        "--config", default=DEFAULT_CONFIG_FILE, help=f"Path to configuration file (default: {DEFAULT_CONFIG_FILE})"
+    )
+
     # Kubeconfig printer
     kubeconfig_parser = subparsers.add_parser("kubeconfig", help="Print path to kubeconfig file for a cluster")
     kubeconfig_parser.add_argument("name", help="Name of the cluster")
@@ -698,11 +1196,13 @@ def main():
         sys.exit(1)
 
     if args.command == "create":
-        create_cluster(args.name, args.config)
+        create_cluster(args.name, args.config, args.refresh_ami, args.use_vanilla_ami)
     elif args.command == "delete":
         delete_cluster(args.name)
     elif args.command == "list":
         show_clusters()
+    elif args.command == "build-ami":
+        build_ami(args.config)
     elif args.command == "kubeconfig":
         cluster_dir = get_cluster_dir(args.name)
         kubeconfig_file = cluster_dir / KUBECONFIG_FILE
@@ -19,7 +19,19 @@ CALICO_VERSION="v3.31.3"
 IMDS_TOKEN="$(curl -sX PUT "http://169.254.169.254/latest/api/token" -H "X-aws-ec2-metadata-token-ttl-seconds: 3600")"
 
 export DEBIAN_FRONTEND=noninteractive
-apt-get update
+
+# images built with `aws-k8s build-ami` already have containerd and the kubernetes tools installed,
+# an image baked with another KUBE_VERSION goes through the full install to get the right version
+PREBUILT_IMAGE=false
+if command -v kubeadm >/dev/null; then
+    case "$(kubeadm version -o short || true)" in
+        "$KUBE_VERSION".*) PREBUILT_IMAGE=true ;;
+    esac
+fi
+
+if [ "$PREBUILT_IMAGE" = false ]; then
+    apt-get update
+fi
 
 CIDR='10.100.0.0/16'
 SERVICE_CIDR='10.101.0.0/16'
@@ -42,16 +54,18 @@ EOF
 
 sysctl --system
 
-apt -y install curl gnupg apt-transport-https ca-certificates software-properties-common
+if [ "$PREBUILT_IMAGE" = false ]; then
+    apt -y install curl gnupg apt-transport-https ca-certificates software-properties-common
 
-# install containerd
-curl -fsSL https://download.docker.com/linux/ubuntu/gpg | gpg --dearmor -o /usr/share/keyrings/docker-archive-keyring.gpg
-tee /etc/apt/sources.list.d/docker.list <<EOF
+    # install containerd
+    curl -fsSL https://download.docker.com/linux/ubuntu/gpg | gpg --batch --yes --dearmor -o /usr/share/keyrings/docker-archive-keyring.gpg
+    tee /etc/apt/sources.list.d/docker.list <<EOF
 deb [arch=amd64 signed-by=/usr/share/keyrings/docker-archive-keyring.gpg] https://download.docker.com/linux/ubuntu $(lsb_release -cs) stable
 EOF
 
-apt update
-apt -y install containerd.io
+    apt update
+    apt -y install containerd.io
+fi
 
 # Detect and setup NVMe instance store if present
 NVME_DEVICE=""
@@ -99,13 +113,15 @@ sed -i 's/SystemdCgroup \= false/SystemdCgroup \= true/' /etc/containerd/config.
 systemctl restart containerd
 
 # isntall kubeadm, kubelet and kubectl
-curl -fsSL https://pkgs.k8s.io/core:/stable:/$KUBE_VERSION/deb/Release.key | gpg --dearmor -o /usr/share/keyrings/kubernetes-archive-keyring.gpg
-tee /etc/apt/sources.list.d/kubernetes.list <<EOF
+if [ "$PREBUILT_IMAGE" = false ]; then
+    curl -fsSL https://pkgs.k8s.io/core:/stable:/$KUBE_VERSION/deb/Release.key | gpg --batch --yes --dearmor -o /usr/share/keyrings/kubernetes-archive-keyring.gpg
+    tee /etc/apt/sources.list.d/kubernetes.list <<EOF
 deb [arch=amd64 signed-by=/usr/share/keyrings/kubernetes-archive-keyring.gpg] https://pkgs.k8s.io/core:/stable:/$KUBE_VERSION/deb/ /
 EOF
 
-apt update
-apt -y install kubelet kubeadm kubectl
+    apt update
+    apt -y install kubelet kubeadm kubectl
+fi
 
 # Get the public IP from EC2 metadata service
 PUBLIC_IP=$(curl -s -H "X-aws-ec2-metadata-token: $IMDS_TOKEN" http://169.254.169.254/latest/meta-data/public-ipv4)
@@ -17,7 +17,19 @@ KUBE_VERSION="v1.35"
 NVIDIA_DRIVER_VERSION="580"
 
 export DEBIAN_FRONTEND=noninteractive
-apt-get update
+
+# images built with `aws-k8s build-ami` already have containerd and the kubernetes tools installed,
+# an image baked with another KUBE_VERSION goes through the full install to get the right version
+PREBUILT_IMAGE=false
+if command -v kubeadm >/dev/null; then
+    case "$(kubeadm version -o short || true)" in
+        "$KUBE_VERSION".*) PREBUILT_IMAGE=true ;;
+    esac
+fi
+
+if [ "$PREBUILT_IMAGE" = false ]; then
+    apt-get update
+fi
 
 swapoff -a
 
@@ -37,16 +49,18 @@ EOF
 
 sysctl --system
 
-apt -y install curl gnupg apt-transport-https ca-certificates software-properties-common
+if [ "$PREBUILT_IMAGE" = false ]; then
+    apt -y install curl gnupg apt-transport-https ca-certificates software-properties-common
 
-# install containerd
-curl -fsSL https://download.docker.com/linux/ubuntu/gpg | gpg --dearmor -o /usr/share/keyrings/docker-archive-keyring.gpg
-tee /etc/apt/sources.list.d/docker.list <<EOF
+    # install containerd
+    curl -fsSL https://download.docker.com/linux/ubuntu/gpg | gpg --batch --yes --dearmor -o /usr/share/keyrings/docker-archive-keyring.gpg
+    tee /etc/apt/sources.list.d/docker.list <<EOF
 deb [arch=amd64 signed-by=/usr/share/keyrings/docker-archive-keyring.gpg] https://download.docker.com/linux/ubuntu $(lsb_release -cs) stable
 EOF
 
-apt update
-apt -y install containerd.io
+    apt update
+    apt -y install containerd.io
+fi
 
 # Detect and setup NVMe instance store if present
 NVME_DEVICE=""
@@ -95,6 +109,11 @@ systemctl restart containerd
 
 # install nvidia drivers and container toolkit if NVIDIA GPU is present
 if lspci | grep -i nvidia; then
+    # package lists baked into a prebuilt image may be stale
+    if [ "$PREBUILT_IMAGE" = true ]; then
+        apt-get update
+    fi
+
     # We pin to the specific kernel version to avoid
     # installing a newer kernel and having to reboot
     apt install -y \
@@ -116,10 +135,15 @@ if lspci | grep -i nvidia; then
 fi
 
 # install kubeadm, kubelet and kubectl
-curl -fsSL https://pkgs.k8s.io/core:/stable:/$KUBE_VERSION/deb/Release.key | gpg --dearmor -o /usr/share/keyrings/kubernetes-archive-keyring.gpg
-tee /etc/apt/sources.list.d/kubernetes.list <<EOF
+if [ "$PREBUILT_IMAGE" = false ]; then
+    curl -fsSL https://pkgs.k8s.io/core:/stable:/$KUBE_VERSION/deb/Release.key | gpg --batch --yes --dearmor -o /usr/share/keyrings/kubernetes-archive-keyring.gpg
+    tee /etc/apt/sources.list.d/kubernetes.list <<EOF
 deb [arch=amd64 signed-by=/usr/share/keyrings/kubernetes-archive-keyring.gpg] https://pkgs.k8s.io/core:/stable:/$KUBE_VERSION/deb/ /
 EOF
 
-apt update
-apt -y install kubelet kubeadm kubectl
+    apt update
+    apt -y install kubelet kubeadm kubectl
+fi
+
+# tell aws-k8s the node is ready to join the cluster
+touch /run/aws-k8s-ready